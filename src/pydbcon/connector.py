@@ -1,25 +1,282 @@
+import os
 import pandas as pd
-from numpy import nan
+from numpy import generic, nan
 import pyodbc as db
-from icecream import ic
+from collections.abc import Callable
 from dataclasses import dataclass, field
-
+from functools import lru_cache
+from itertools import chain
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
 
 TableColumns = set[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TypedColumn:
     column: str
     type: str
-    value: any = None
+    value: Any = None
 
 
 # Dictionary with column name-typed column pairs
 ColumnTypeList = list[TypedColumn]
 
 
-@dataclass
+# pandas dtype names for python types, asked from the installed pandas (they differ between versions, e.g. `str` is `'object'` before pandas 3)
+_PD_TYPE_NAMES = {
+    type(sample): str(pd.Series([sample]).dtype)
+    for sample in (True, 1, 1.0, "", datetime(2000, 1, 1), pd.Timestamp(2000, 1, 1))
+}
+
+
+def _pd_type_name(value) -> str:
+    """Name of the pandas dtype a column holding `value` would have, same as `pd.json_normalize` would infer.
+
+    >>> _pd_type_name(10) == str(pd.json_normalize({'a': 10}).dtypes['a'])
+    True
+    >>> _pd_type_name('text') == str(pd.json_normalize({'a': 'text'}).dtypes['a'])
+    True
+    >>> _pd_type_name(None)
+    'object'
+    """
+    if (name := _PD_TYPE_NAMES.get(type(value))) is not None:
+        return name
+    return str(getattr(value, "dtype", "object"))
+
+
+def _normalize_record(record: dict, prefix="") -> dict:
+    """Flattens nested dictionaries into a single level, joining keys with `.` (same as `pd.json_normalize`).
+
+    >>> _normalize_record({'a': 1, 'b': {'c': 2, 'd': {'e': 3}}, 'f': [{'g': 4}]})
+    {'a': 1, 'b.c': 2, 'b.d.e': 3, 'f': [{'g': 4}]}
+    >>> from collections import OrderedDict
+    >>> _normalize_record({'id': 1, 'meta': OrderedDict(a=1)})
+    {'id': 1, 'meta.a': 1}
+    """
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(_normalize_record(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}" if prefix else key] = value
+    return flat
+
+
+def _no_op(*args):
+    pass
+
+
+def _python_value(value):
+    """Converts numpy scalars (which pyodbc can't bind) into the equivalent python value.
+
+    >>> import numpy as np
+    >>> _python_value(np.int64(10)), _python_value('id')
+    (10, 'id')
+    """
+    return value.item() if isinstance(value, generic) else value
+
+
+@lru_cache(maxsize=None)
+def _value_kind(sql_type: str) -> str:
+    """How values of the given SQL type are handled: `'bit'`, `'int'`, `'datetime'` or `'other'`.
+
+    >>> _value_kind('bit'), _value_kind('BIGINT'), _value_kind('varchar(max)'), _value_kind(None)
+    ('bit', 'int', 'other', 'other')
+    """
+    if sql_type is None:
+        return "other"
+    tag = sql_type.split("(")[0].strip().lower()
+    if tag in ("bit", "datetime"):
+        return tag
+    if "int" in tag:
+        return "int"
+    return "other"
+
+
+def _quote(value, prefix="") -> str:
+    """SQL string literal for `value`, escaping single quotes.
+
+    >>> _quote("it's", prefix='N')
+    "N'it''s'"
+    """
+    v = str(value)
+    if "'" in v:
+        v = v.replace("'", "''")
+    return f"{prefix}'{v}'"
+
+
+def _quote_identifier(name: str) -> str:
+    """Bracket-quoted SQL Server identifier, escaping closing brackets.
+
+    >>> _quote_identifier('column]name')
+    '[column]]name]'
+    """
+    return f"[{str(name).replace(']', ']]')}]"
+
+
+# SQL literal for a (non-null) value, by value kind
+_PARSERS = {
+    "bit": lambda v: str(int(v)),
+    "int": lambda v: str(int(v)),
+    "datetime": _quote,
+    "other": lambda v: _quote(v, prefix="N"),
+}
+
+
+# parameter expression for a column of the generated row codecs, by value kind
+_CODEC_EXPRESSIONS = {
+    "bit": "int(v)",
+    "int": "int(v)",
+    "datetime": "v",
+    "other": "(str(v) if type(v) == list else v)",
+}
+
+
+# bounded: keyed by each batch's column set, which varies freely for ragged records
+@lru_cache(maxsize=256)
+def _compile_row_codec(columns: tuple[tuple[str, str], ...]) -> Callable:
+    """Compiles a function that turns a row (dictionary of column values) into a tuple of query parameters.
+
+    The column order and the handling of each value kind are written into the function,
+    so rows are converted without any per-column type checks.
+
+    :param tuple[tuple[str, str], ...] columns: column name and value kind (see `_value_kind`) pairs
+    :return Callable: function from a row dictionary to a parameter tuple
+
+    >>> codec = _compile_row_codec((('id', 'int'), ('flag', 'bit'), ('name', 'other')))
+    >>> codec({'id': 10.0, 'flag': True, 'name': "it's"})
+    (10, 1, "it's")
+    >>> codec({'id': 11, 'name': ''})
+    (11, None, None)
+    """
+    expressions = "".join(
+        f"        None if (v := row.get({column!r})) is None or v == '' else {_CODEC_EXPRESSIONS[kind]},\n"
+        for column, kind in columns
+    )
+    namespace = {}
+    exec(f"def codec(row):\n    return (\n{expressions}    )\n", namespace)
+    return namespace["codec"]
+
+
+# bounded like `_compile_row_codec`: ragged records produce a new column tuple per distinct set of non-null columns
+@lru_cache(maxsize=256)
+def _insert_query(table: str, columns: tuple[str, ...]) -> str:
+    """Parameterized `insert` query for the given table and columns.
+
+    >>> _insert_query('t', ('id', 'name'))
+    'insert into [t] ([id], [name]) values (?,?)'
+    """
+    column_names = ", ".join(map(_quote_identifier, columns))
+    question_marks = ("?," * len(columns))[:-1]
+    return f"insert into {_quote_identifier(table)} ({column_names}) values ({question_marks})"
+
+
+@lru_cache(maxsize=256)
+def _update_query(table: str, columns: tuple[str, ...], id_column: str) -> str:
+    """Parameterized `update` query for the given table and columns, with the ID bound last.
+
+    >>> _update_query('t', ('id', 'name'), 'id')
+    'update [t] set [id]=?, [name]=? where [id]=?'
+    """
+    assignments = ", ".join(f"{_quote_identifier(c)}=?" for c in columns)
+    return f"update {_quote_identifier(table)} set {assignments} where {_quote_identifier(id_column)}=?"
+
+
+# query parameter value for a (non-null) value, by value kind
+_BINDERS = {
+    "bit": int,
+    "int": int,
+    "datetime": lambda v: v,
+    "other": lambda v: str(v) if type(v) == list else v,
+}
+
+
+def _bulk_csv_value(value):
+    """Value as `bulk insert` reads it from a CSV field: bits as 0/1, lists as strings and datetimes to the millisecond.
+
+    >>> _bulk_csv_value(True), _bulk_csv_value([1]), _bulk_csv_value(datetime(2020, 1, 1, 1, 2, 3, 456789))
+    (1, '[1]', '2020-01-01 01:02:03.456')
+    """
+    if type(value) == bool:
+        return int(value)
+    if type(value) == list:
+        return str(value)
+    if isinstance(value, datetime):
+        # `datetime` columns reject more than 3 fractional digits
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    return value
+
+
+def _bulk_csv_column(values: pd.Series) -> pd.Series:
+    """Column values ready to be written to a `bulk insert` CSV, see `_bulk_csv_value`.
+
+    Columns holding only integral floats (integer columns with missing values, as pandas infers them) are written as integers,
+    since `5.0` does not convert to an `int` column.
+
+    >>> _bulk_csv_column(pd.Series([5.0, None])).tolist()
+    [5, None]
+    >>> _bulk_csv_column(pd.Series([5.5, 1.0])).tolist()
+    [5.5, 1.0]
+    """
+    values = values.astype(object).where(values.notna(), None)
+    present = [v for v in values if v is not None]
+    convert = (
+        int
+        if len(present) > 0
+        and all(isinstance(v, float) and v.is_integer() for v in present)
+        else _bulk_csv_value
+    )
+    return pd.Series(
+        [None if v is None else convert(v) for v in values],
+        index=values.index,
+        dtype=object,
+    )
+
+
+# Trie key for nodes that end a prefix/suffix, holds `(priority, sql_type)`
+_TRIE_END = ""
+
+
+def _build_trie(mapping: dict[str, str], reverse=False) -> dict:
+    """Builds a character trie from the keys of `mapping`.
+
+    :param dict[str, str] mapping: key to SQL type mapping
+    :param bool reverse: if True, keys are inserted back to front (for suffix matching), defaults to False
+    :return dict: nested dictionaries of `{char: node}`
+    """
+    trie = {}
+    for priority, (key, sql_type) in enumerate(mapping.items()):
+        node = trie
+        for char in reversed(key) if reverse else key:
+            node = node.setdefault(char, {})
+        node[_TRIE_END] = (priority, sql_type)
+    return trie
+
+
+def _search_trie(trie: dict, chars) -> str | None:
+    """Walks `trie` along `chars`, returning the SQL type of the matching key that came first in its mapping.
+
+    >>> _search_trie(_build_trie({'pre_': 'int', 'p': 'bit'}), 'pre_column')
+    'int'
+    >>> _search_trie(_build_trie({'_su': 'int'}, reverse=True), reversed('column_su'))
+    'int'
+    >>> _search_trie(_build_trie({'pre_': 'int'}), 'column')
+    """
+    node = trie
+    best = node.get(_TRIE_END)
+    for char in chars:
+        node = node.get(char)
+        if node is None:
+            break
+        end = node.get(_TRIE_END)
+        if end is not None and (best is None or end < best):
+            best = end
+    return None if best is None else best[1]
+
+
+@dataclass(slots=True)
 class TypeMapper:
     """TypeMapper class
 
@@ -29,6 +286,9 @@ class TypeMapper:
 
     Will use first dictionary where it finds the given value
 
+    `prefix` and `suffix` are compiled into tries when the mapper is created, and mapped types are memoized per column name and type,
+    so `recompile` should be called after mutating any of the dictionaries.
+
     :param dict[str, str] direct: direct mapping, will map from column name (dict key) to SQL type (dict value)
     :param dict[str, str] prefix: will map from column name that has given prefix (dict key) to SQL type (dict value), defaults to an empty dictionary
     :param dict[str, str] suffix: will map from column name that has given suffix (dict key) to SQL type (dict value), defaults to an empty dictionary
@@ -56,16 +316,53 @@ class TypeMapper:
     prefix: dict[str, str] = field(default_factory=dict)
     suffix: dict[str, str] = field(default_factory=dict)
     typed: dict[str, str] = field(default_factory=dict)
+    _prefix_trie: dict = field(init=False, repr=False, compare=False)
+    _suffix_trie: dict = field(init=False, repr=False, compare=False)
+    _cache: dict[tuple[str, str], str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.recompile()
+
+    def recompile(self):
+        """Rebuilds prefix/suffix tries and clears memoized types.
+
+        >>> tm = TypeMapper(prefix={'pre_': 'int'})
+        >>> tm.map(column_name='pre_column')
+        'int'
+        >>> tm.prefix['pre_'] = 'bigint'
+        >>> tm.recompile()
+        >>> tm.map(column_name='pre_column')
+        'bigint'
+        """
+        self._prefix_trie = _build_trie(self.prefix)
+        self._suffix_trie = _build_trie(self.suffix, reverse=True)
+        self._cache = {}
 
     def map(self, column_name: str, column_type: str = None) -> str:
+        key = (column_name, column_type)
+        if key not in self._cache:
+            self._cache[key] = self._map(column_name, column_type)
+        return self._cache[key]
+
+    def _map(self, column_name: str, column_type: str = None) -> str:
+        """Uncached `map`. Tries are only walked when they have keys, so non-string column names still reach `typed`.
+
+        >>> TypeMapper(typed={'int64': 'int'}).map(5, 'int64')
+        'int'
+        """
         if column_name in self.direct:
             return self.direct[column_name]
-        for p in self.prefix:
-            if column_name[: len(p)] == p:
-                return self.prefix[p]
-        for s in self.suffix:
-            if column_name[-len(s) :] == s:
-                return self.suffix[s]
+        if (
+            self._prefix_trie
+            and (sql_type := _search_trie(self._prefix_trie, column_name)) is not None
+        ):
+            return sql_type
+        if (
+            self._suffix_trie
+            and (sql_type := _search_trie(self._suffix_trie, reversed(column_name)))
+            is not None
+        ):
+            return sql_type
         if column_type in self.typed:
             return self.typed[column_type]
 
@@ -77,10 +374,13 @@ class DBConnector:
         table: str,
         type_mapper: TypeMapper | dict = TypeMapper(),
         verbose=False,
-        id_column="id",
-        logger=ic,
+        id_column: str = "id",
+        logger=print,
         composite_kwargs: dict = None,
-        do_fast_executemany=False,
+        do_fast_executemany=True,
+        bulk_path: str = None,
+        bulk_threshold=10_000,
+        fetch_size=1000,
     ):
         """Creates connection to database
 
@@ -97,9 +397,12 @@ class DBConnector:
 
         :param str connection_string: connection string
         :param str table: working table name
-        :param bool verbose: whether to verbose print, defaults to True
-        :param str id_column: column to be used as ID for update functions
-        :param Callable logger: logging function, defaults to `ic`
+        :param bool verbose: whether to verbose print, defaults to False
+        :param str id_column: column to be used as ID for update functions, defaults to "id"
+        :param Callable logger: logging function, defaults to `print`
+        :param str bulk_path: directory, readable by both this process and the SQL Server, where `execute_batch` stages files for `bulk insert`, defaults to None (no bulk inserts)
+        :param int bulk_threshold: minimum number of new rows for `execute_batch` to use `bulk insert` (when `bulk_path` is set), defaults to 10000
+        :param int fetch_size: number of rows `select` fetches from the database at a time, defaults to 1000
         """
         if type(type_mapper) == dict:
             type_mapper = TypeMapper(**type_mapper)
@@ -107,47 +410,91 @@ class DBConnector:
         self.type_mapper = type_mapper
         self.table = table
         self._connection_string = connection_string
+        self._do_fast_executemany = do_fast_executemany
+        self.fetch_size = fetch_size
         self._con = db.connect(connection_string)
+        # nothing is committed implicitly: each unit of work ends with an explicit `commit`
+        self._con.autocommit = False
+        self._open_cursor()
+        self.logger = logger
         self.verbose = verbose
         self.cache_table_columns()
-        self._crsr = self._con.cursor()
-        self.logger = logger
         self.id_cache = None
-        self.df: pd.DataFrame = None
+        self._rows: list[dict] = []
         self.do_composite_id = composite_kwargs is not None
         self.composite_kwargs: dict = composite_kwargs
         if self.do_composite_id:
             self.id_column = self.composite_kwargs["id_name"]
-        self.do_fast_executemany = do_fast_executemany
+        self.bulk_path = bulk_path
+        self.bulk_threshold = bulk_threshold
 
     def get_table_columns(self) -> TableColumns:
         return {
             cn[0]
-            for cn in self.execute(
-                f"select column_name from information_schema.columns where TABLE_NAME='{self.table}'"
+            for cn in self._execute(
+                "select column_name from information_schema.columns where TABLE_NAME=?",
+                params=(self.table,),
             ).fetchall()
         }
 
+    def get_ordered_table_columns(self) -> list[str]:
+        """Table columns, in the order they were defined in the table"""
+        return [
+            cn[0]
+            for cn in self._execute(
+                "select column_name from information_schema.columns where TABLE_NAME=? order by ORDINAL_POSITION",
+                params=(self.table,),
+            ).fetchall()
+        ]
+
     def cache_table_columns(self):
-        """Caches table columns from SQL database"""
+        """Caches table columns from SQL database
+
+        The cache is kept up to date with the columns and tables created through this connector,
+        call this to pick up schema changes made elsewhere.
+        """
         self.table_columns = self.get_table_columns()
 
     def has_column(self, column: str) -> bool:
         return column in self.table_columns
 
     def add_column(self, column: str, column_type: str):
-        self.execute(f"alter table [{self.table}] add [{column}] {column_type} NULL")
-        self.commit()
-
-    def vp(self, content: str):
+        self.add_columns([TypedColumn(column=column, type=column_type)])
+
+    @property
+    def do_fast_executemany(self) -> bool:
+        return self._do_fast_executemany
+
+    @do_fast_executemany.setter
+    def do_fast_executemany(self, do_fast_executemany: bool):
+        self._do_fast_executemany = do_fast_executemany
+        # the shared cursor is already open, so it has to follow the flag here
+        self._crsr.fast_executemany = do_fast_executemany
+
+    @property
+    def verbose(self) -> bool:
+        return self._verbose
+
+    @verbose.setter
+    def verbose(self, verbose: bool):
+        self._verbose = verbose
+        # when not verbose, `vp` calls skip straight to a no-op
+        if verbose:
+            self.__dict__.pop("vp", None)
+        else:
+            self.vp = _no_op
+
+    def vp(self, content: str | Callable[[], str]):
         """Verbose prints.
 
-        Passes `content` to `logger` (`ic`, if unset) if `self.verbose` is set to `True`]
+        Passes `content` to `logger` (`print`, if unset) if `self.verbose` is set to `True`.
+
+        `content` can also be a function that returns the string, so it's only formatted when verbose printing is on.
 
-        :param str content: string to be sent to `logger`
+        :param str | Callable[[], str] content: string (or function returning the string) to be sent to `logger`
         """
         if self.verbose:
-            self.logger(content)
+            self.logger(content() if callable(content) else content)
 
     @staticmethod
     def create_connection_string(
@@ -176,86 +523,150 @@ class DBConnector:
     def has_table(self) -> bool:
         """Checks if given `table` exists in the connected database
 
+        Tables with cached columns are known to exist, and are not looked up again.
+
         :param str table: table name
         :return bool: True if table exists in database, false otherwise
         """
-        return bool(
-            self._con.cursor().tables(table=self.table, tableType="TABLE").fetchone()
-        )
+        if self.table_columns:
+            return True
+        return bool(self._crsr.tables(table=self.table, tableType="TABLE").fetchone())
 
     def create_table(self, type_list: ColumnTypeList):
-        self.execute(
-            sql_query=f"create table {self.table}({', '.join((f'[{t.column}] {t.type}' for t in type_list))})"
+        columns = ", ".join(
+            f"{_quote_identifier(t.column)} {t.type}" for t in type_list
         )
-        self.cache_table_columns()
+        if (
+            self._execute(
+                sql_query=f"create table {_quote_identifier(self.table)}({columns})"
+            )
+            is None
+        ):
+            return
+        self.table_columns = {t.column for t in type_list}
         self.commit()
 
+    def _open_cursor(self):
+        """Opens the long-lived cursor shared by `execute` and `executemany`."""
+        self._crsr = self._con.cursor()
+        self._crsr.fast_executemany = self.do_fast_executemany
+
     def reconnect(self):
         self._con = db.connect(self._connection_string)
+        self._con.autocommit = False
+        self._open_cursor()
+        self.invalidate_id_cache()
 
     def commit(self, reconnect_attempts=1):
         """Commits executed queries to database.
 
         :param int reconnect_attempts: number of times to retry connecting to the database if `commit` throws an error, defaults to 1
         """
-        try:
-            self._con.commit()
-        except db.Error as pe:
-            self.vp(f"\t---commit error: {pe}")
-            if reconnect_attempts == 0:
-                return
-            self.vp(f"\t---reattempting commit ({reconnect_attempts})")
+        for attempt in range(reconnect_attempts + 1):
             try:
-                self.reconnect()
-                self.commit(reconnect_attempts - 1)
-            except:
-                self.vp(f"\t---couldn't reconnect to db")
+                self._con.commit()
+                return
+            except db.Error as pe:
+                self.vp(lambda: f"\t---commit error: {pe}")
+                if attempt == reconnect_attempts:
+                    return
+                self.vp(
+                    lambda: f"\t---reattempting commit ({reconnect_attempts - attempt})"
+                )
+                try:
+                    self.reconnect()
+                except db.Error:
+                    self.vp("\t---couldn't reconnect to db")
+                    return
 
-    def execute(self, sql_query: str, tries=10, is_first=True, current=1):
+    def execute(self, sql_query: str, tries=10, params: tuple = ()):
         """Executes the given SQL query.
 
+        The query runs on a cursor of its own, so the returned results stay readable while the connector executes other queries.
+
         :param str sql_query: SQL query string
         :param int tries: number of times to try executing the query before giving up, defaults to 10
-        :param bool is_first: used to track number of tries, defaults to True
+        :param tuple params: values bound to the `?` placeholders in `sql_query`, defaults to no values
         """
-        _tabs = "\t" * current
+        return self._execute(
+            sql_query, tries=tries, params=params, do_share_cursor=False
+        )
 
-        if tries == 0:
-            self.logger(f"{_tabs}---failed to execute {sql_query}")
-            return
+    def _execute(
+        self, sql_query: str, tries=10, params: tuple = (), do_share_cursor=True
+    ):
+        """`execute`, by default on the connector's shared cursor, for its own queries.
 
-        try:
-            r = self._con.execute(sql_query)
-            if not is_first:
-                self.vp(f"{_tabs}---execute successful")
-            return r
-        except db.Error as pe:
-            self.vp(f"{_tabs}---could not execute: {pe}")
+        Results from the shared cursor must be read before the next query on it is executed.
+
+        :param bool do_share_cursor: whether to run the query on the shared cursor instead of a new one, defaults to True
+        """
+        for attempt in range(1, tries + 1):
+            _tabs = "\t" * attempt
             try:
-                self.vp(f"{_tabs}---attempt {current} ({tries} left)")
-                return self.execute(sql_query, tries - 1, False, current + 1)
-            except:
-                return
+                cursor = self._crsr if do_share_cursor else self._con.cursor()
+                r = cursor.execute(sql_query, *params)
+                if attempt > 1:
+                    self.vp(lambda: f"{_tabs}---execute successful")
+                return r
+            except db.Error as pe:
+                self.vp(lambda: f"{_tabs}---could not execute: {pe}")
+                self.vp(lambda: f"{_tabs}---attempt {attempt} ({tries - attempt} left)")
+
+        self.logger(f"---failed to execute {sql_query}")
 
     def typed_columns(self, obj_dict: dict, do_keep_nulls=False) -> ColumnTypeList:
         """List with column name, value and types extracted from given object dictionary.
 
+        Nested dictionaries are flattened the same way as `pd.json_normalize`, and types are inferred from each value's python type
+        without building a dataframe.
+
         :param dict obj_dict: dictionary
-        :return list[dict[str, any]]: list of dictionaries
+        :param bool do_keep_nulls: if True, columns with `None` values are kept, defaults to False
+        :return ColumnTypeList: typed columns
         """
-        df = pd.json_normalize(obj_dict)
-        pd_types = df.dtypes.to_dict()
-
-        skip_none = lambda v: True if do_keep_nulls else (v is not None)
-
         return [
             TypedColumn(
                 column=key,
                 value=val,
-                type=self.type_mapper.map(key, str(pd_types[key])),
+                type=self.type_mapper.map(key, _pd_type_name(val)),
             )
-            for key, val in df.iloc[0].to_dict().items()
-            if skip_none(val)
+            for key, val in _normalize_record(obj_dict).items()
+            if do_keep_nulls or val is not None
+        ]
+
+    def typed_columns_batch(
+        self, obj_dicts: list[dict], do_keep_nulls=False
+    ) -> list[ColumnTypeList]:
+        """Typed columns for each of the given object dictionaries.
+
+        Types are inferred once over the whole batch (with pandas), so a column is given the same type in every row.
+
+        :param list[dict] obj_dicts: list of dictionaries
+        :return list[ColumnTypeList]: one `ColumnTypeList` per dictionary
+        """
+        df = pd.json_normalize(obj_dicts)
+        types = {t.column: t.type for t in self.frame_type_list(df)}
+        df = df.astype(object).where(df.notna(), None)
+
+        return [
+            [
+                TypedColumn(column=key, value=val, type=types[key])
+                for key, val in record.items()
+                if do_keep_nulls or val is not None
+            ]
+            for record in df.to_dict("records")
+        ]
+
+    def frame_type_list(self, df: pd.DataFrame) -> ColumnTypeList:
+        """Typed columns (without values) for the columns of the given dataframe, mapped from their pandas dtypes.
+
+        :param pd.DataFrame df: dataframe
+        :return ColumnTypeList: one `TypedColumn` per dataframe column
+        """
+        return [
+            TypedColumn(column=key, type=self.type_mapper.map(key, str(pd_type)))
+            for key, pd_type in df.dtypes.to_dict().items()
         ]
 
     @staticmethod
@@ -276,7 +687,12 @@ class DBConnector:
         >>> DBConnector.flatten_dict({'a': 1, 'b': [{'k': 2, 'val': 0}, {'k': 1, 'val': 2}]}, key='k')
         {'a': 1, 'b': {2: {'val': 0}, 1: {'val': 2}}}
         """
-        return {k: DBConnector.flatten_dict_list(v, key) for k, v in d.items()}
+        flatten = DBConnector.flatten_dict_list
+        # scalars are by far the most common values; keep them off the call path
+        return {
+            k: flatten(v, key) if isinstance(v, (list, dict)) else v
+            for k, v in d.items()
+        }
 
     @staticmethod
     def flatten_dict_list(dlist: list[dict], key: str | list[str]):
@@ -293,117 +709,187 @@ class DBConnector:
         >>> DBConnector.flatten_dict_list([{'k': 2, 'val': 0}, {'k': 1, 'val': 2}], key='k')
         {2: {'val': 0}, 1: {'val': 2}}
         """
-        wrong_type = lambda x: type(x) != list and type(x) != dict
-        if wrong_type(dlist) or (
-            type(dlist) == list and len(dlist) > 0 and wrong_type(dlist[0])
-        ):
-            return dlist
-
-        if type(dlist) == dict:
+        if isinstance(dlist, dict):
             return DBConnector.flatten_dict(dlist, key)
 
-        def choose_key(d: dict) -> str:
-            if type(key) == str:
-                return key
-            for k in key:
-                if k in d:
-                    return k
-            return None
+        if not isinstance(dlist, list):
+            return dlist
 
-        no_keys_in_dict = (
-            choose_key(dlist[0]) not in dlist[0] and choose_key(dlist[0]) == None
-        )
+        if len(dlist) == 0:
+            return str(dlist)
+
+        first = dlist[0]
+        if not isinstance(first, (list, dict)):
+            return dlist
 
-        if no_keys_in_dict:
+        if DBConnector._choose_key(first, key) not in first:
             return str(dlist)
 
-        flattened = {
-            d[choose_key(d)]: DBConnector.flatten_dict_list(d, key) for d in dlist
-        }
-        for v in flattened.values():
-            v.pop(choose_key(v))
+        flattened = {}
+        for d in dlist:
+            k = DBConnector._choose_key(d, key)
+            value = DBConnector.flatten_dict(d, key)
+            value.pop(k)
+            flattened[d[k]] = value
         return flattened
 
+    @staticmethod
+    def _choose_key(d: dict, key: str | list[str]) -> str:
+        """Key from `key` to be used for `d`: `key` itself if it is a string, or the first item of `key` found in `d`
+
+        >>> DBConnector._choose_key({'a': 1, 'b': 2}, ['c', 'b', 'a'])
+        'b'
+        """
+        if isinstance(key, str):
+            return key
+        for k in key:
+            if k in d:
+                return k
+        return None
+
     def add_columns(self, typed_columns: ColumnTypeList):
         """Adds columns in `ColumnTypeList` to working table
 
+        Columns that are missing from the table are all added with a single `alter table` statement.
+
         :param ColumnTypeList typed_columns: dictionary of column names and their respective types
         """
-        for t in typed_columns:
-            if not self.has_column(t.column):
-                self.add_column(t.column, t.type)
-                self.cache_table_columns()
+        missing = {
+            t.column: t.type for t in typed_columns if not self.has_column(t.column)
+        }
+        if len(missing) == 0:
+            return
+
+        columns = ", ".join(
+            f"{_quote_identifier(c)} {column_type} NULL"
+            for c, column_type in missing.items()
+        )
+        if (
+            self._execute(f"alter table {_quote_identifier(self.table)} add {columns}")
+            is None
+        ):
+            return
+        self.commit()
+        self.table_columns |= missing.keys()
 
     @staticmethod
     def parse_value(data: TypedColumn) -> tuple[str, str]:
         """Converts python values into valid SQL values.
 
+        Inline SQL literals are deprecated and only kept for debugging, queries bind their values with `DBConnector.bind_value`.
+
         :param TypedColumn data: original python data
-        :return tuple[str, str]: tuple of column name and SQL-type
+        :return tuple[str, str]: tuple of column name and SQL value
 
-        >>> DBConnector.parse_value(TypedColumn('none_column', None, any))
+        >>> DBConnector.parse_value(TypedColumn('none_column', 'int', None))
         ('none_column', 'NULL')
-        >>> DBConnector.parse_value(TypedColumn('empty_string', '', str))
+        >>> DBConnector.parse_value(TypedColumn('empty_string', 'varchar(max)', ''))
         ('empty_string', 'NULL')
-        >>> DBConnector.parse_value(TypedColumn('bool_column', True, 'bit'))
+        >>> DBConnector.parse_value(TypedColumn('bool_column', 'bit', True))
         ('bool_column', '1')
-        >>> DBConnector.parse_value(TypedColumn('int_column', 10, 'int'))
+        >>> DBConnector.parse_value(TypedColumn('int_column', 'int', 10))
         ('int_column', '10')
-        >>> DBConnector.parse_value(TypedColumn('other_column', "text string", 'varchar(max)'))
+        >>> DBConnector.parse_value(TypedColumn('other_column', 'varchar(max)', "text string"))
         ('other_column', "N'text string'")
+        >>> DBConnector.parse_value(TypedColumn('quoted_column', 'varchar(max)', "it's"))
+        ('quoted_column', "N'it''s'")
 
         """
-
-        if data.type == "datetime":
-            return (data.column, data.value)
-        if (data.value is None) or (type(data.value) == str and len(data.value) == 0):
+        if data.value is None or (isinstance(data.value, str) and not data.value):
             return (data.column, "NULL")
-        if data.type == "bit":
-            return (data.column, str(int(data.value)))
-        if "int" in data.type:
-            return (data.column, int(data.value))
-        return (data.column, data.value)
+        return (data.column, _PARSERS[_value_kind(data.type)](data.value))
+
+    @staticmethod
+    def bind_value(data: TypedColumn) -> Any:
+        """Converts python values into values that can be bound to a `?` query parameter.
+
+        :param TypedColumn data: original python data
+        :return Any: value to be bound
+
+        >>> DBConnector.bind_value(TypedColumn('none_column', 'int', None))
+        >>> DBConnector.bind_value(TypedColumn('empty_string', 'varchar(max)', ''))
+        >>> DBConnector.bind_value(TypedColumn('bool_column', 'bit', True))
+        1
+        >>> DBConnector.bind_value(TypedColumn('int_column', 'int', 10.0))
+        10
+        >>> DBConnector.bind_value(TypedColumn('other_column', 'varchar(max)', 'text string'))
+        'text string'
+        """
+        if data.value is None or (isinstance(data.value, str) and not data.value):
+            return None
+        return _BINDERS[_value_kind(data.type)](data.value)
 
-    def sql_update_str(self, typed_columns: ColumnTypeList, id: str) -> str:
+    def sql_update_str(
+        self, typed_columns: ColumnTypeList, id: str
+    ) -> tuple[str, tuple]:
         """Updates row with `id` using the given `typed_columns`
 
         :param ColumnTypeList typed_columns:
         :param str id: row ID
-        :return str: SQL query string
+        :return tuple[str, tuple]: SQL query string with `?` placeholders and the values to be bound to them
         """
-        parsed_values: dict[str, str] = dict(
-            map(DBConnector.parse_value, typed_columns)
+        values = {t.column: DBConnector.bind_value(t) for t in typed_columns}
+        return (
+            self._update_template(tuple(values)),
+            (*values.values(), _python_value(id)),
         )
-        return f"update {self.table} set {', '.join([f'[{c}]={v}' for c, v in parsed_values.items()])} where {self.id_column}={id if type(id) == int else f"'{id}'"}"
 
-    def sql_columns_and_values(self, typed_columns: ColumnTypeList) -> tuple[str, str]:
-        """Generates SQL strings for columns and values from a given `ColumnTypeList`
+    def sql_columns_and_values(
+        self, typed_columns: ColumnTypeList
+    ) -> tuple[str, str, tuple]:
+        """Generates SQL strings for columns and value placeholders from a given `ColumnTypeList`
 
         :param ColumnTypeList typed_columns:
-        :return tuple[str, str]: tuple with columns and values strings (respectively)
+        :return tuple[str, str, tuple]: tuple with columns string, placeholders string and values to be bound (respectively)
         """
-        return f"[{'], ['.join([t.column for t in typed_columns])}]", ", ".join(
-            dict(map(DBConnector.parse_value, typed_columns)).values()
+        values = {t.column: DBConnector.bind_value(t) for t in typed_columns}
+        return (
+            ", ".join(map(_quote_identifier, values)),
+            ("?," * len(values))[:-1],
+            tuple(values.values()),
         )
 
-    def sql_insertion_str(self, typed_columns: ColumnTypeList) -> str:
+    def sql_insertion_str(self, typed_columns: ColumnTypeList) -> tuple[str, tuple]:
         """Creates valid SQL string to insert a row using the given typed columns.
 
+        Meant for one-off inserts and debugging, use `DBConnector.insert_many` when inserting several rows.
+
         :param ColumnTypeList typed_columns:
-        :return str: SQL insert string
+        :return tuple[str, tuple]: SQL insert string with `?` placeholders and the values to be bound to them
         """
-        columns, values = self.sql_columns_and_values(typed_columns)
-        return f"insert into {self.table} ({columns}) values ({values})"
+        values = {t.column: DBConnector.bind_value(t) for t in typed_columns}
+        return self._insert_template(tuple(values)), tuple(values.values())
+
+    def _insert_template(self, columns: tuple[str, ...]) -> str:
+        """Parameterized `insert` query for the given columns, cached per table and columns
+
+        :param tuple[str, ...] columns: column names, in the order their values are bound
+        :return str: SQL insert string with `?` placeholders
+        """
+        return _insert_query(self.table, columns)
+
+    def _update_template(self, columns: tuple[str, ...]) -> str:
+        """Parameterized `update` query for the given columns (with the ID bound last), cached per table, columns and ID column
+
+        :param tuple[str, ...] columns: column names, in the order their values are bound
+        :return str: SQL update string with `?` placeholders
+        """
+        return _update_query(self.table, columns, self.id_column)
 
     def select(self, selection_str: str):
         """Yields row-by-row results for the given SQL selection string
 
+        Rows are fetched from the database in chunks of `fetch_size` rows (see `DBConnector.__init__`),
+        through a cursor of their own, so other queries can be executed while the selection is being read.
+        To read only the first few rows of a large selection, prefer `DBConnector.execute(selection_str).fetchone()`.
+
         :param str selection_str:
         :yield tuple[any]: list of values for the current row
         """
-        self._crsr.execute(selection_str)
-        while (row := self._crsr.fetchone()) is not None:
-            yield row
+        cursor = self._con.cursor()
+        cursor.execute(selection_str)
+        while rows := cursor.fetchmany(self.fetch_size):
+            yield from rows
 
     @staticmethod
     def connection_from_file(json_fname: str, table: str, **args) -> "DBConnector":
@@ -433,21 +919,29 @@ class DBConnector:
         connection_string = DBConnector.create_connection_string(**data)
         return DBConnector(connection_string, table, **args)
 
-    def get_table_ids(self, recache=True) -> set[int]:
+    def invalidate_id_cache(self):
+        """Clears cached table IDs, so they are fetched from the table on the next `DBConnector.get_table_ids` call"""
+        self.id_cache = None
+
+    def get_table_ids(self, recache=False) -> set[int]:
         """Retrieves ID column from given table.
 
-        :param bool recache: if True, table IDs weill be recached through a call to the SQL table.
+        IDs are cached after the first call, and kept up to date with the rows inserted through this connector.
+
+        :param bool recache: if True, table IDs weill be recached through a call to the SQL table, defaults to False
         :return set: set with IDs
         """
         if recache or self.id_cache is None:
-            ids = self.execute(f"select [{self.id_column}] from [{self.table}]")
+            ids = self._execute(
+                f"select {_quote_identifier(self.id_column)} from {_quote_identifier(self.table)}"
+            )
             self.id_cache = set(i[0] for i in ([] if ids is None else ids.fetchall()))
         return self.id_cache
 
     def insert_dict(
         self,
         obj_dict: dict,
-        recache=True,
+        recache=False,
         force=False,
         do_create_columns=True,
         do_composite_id=False,
@@ -456,7 +950,7 @@ class DBConnector:
         """Inserts generic dictionary to table
 
         :param dict obj_dict: dictionary to be appended
-        :param bool recache: whether to recache table IDs, defaults to True
+        :param bool recache: whether to recache table IDs, defaults to False
         :param bool force: if object ID is already present in the table, the row will be updated with the given values inside `obj_dict`, defaults to False
         :param bool do_create_columns: if columns don't exist in the table, they will be added to the table (as opposed to throwing an error when set to False), defaults to True
         :param bool do_composite_id: if True, adds a composite ID to the flattened dictionary using the `DBConnector.composite_id_type_column` function, defaults to False
@@ -466,6 +960,8 @@ class DBConnector:
         type_list = self.typed_columns(obj_dict)
 
         if do_composite_id:
+            if self.id_column != composite_id_kwargs["id_name"]:
+                self.invalidate_id_cache()
             self.id_column = composite_id_kwargs["id_name"]
             type_list += [
                 DBConnector.composite_id_type_column(type_list, **composite_id_kwargs)
@@ -475,25 +971,135 @@ class DBConnector:
         if not self.has_table():
             self.create_table(type_list)
 
-        if id in self.get_table_ids(recache):
-            if not force:
-                return False
+        ids = self.get_table_ids(recache)
+        if id in ids and not force:
+            return False
 
-        self.vp(f"> {id}")
+        self.vp(lambda: f"> {id}")
 
         if do_create_columns:
             self.add_columns(type_list)
 
-        sql_query = self.sql_insertion_str(type_list)
+        sql_query, params = self.sql_insertion_str(type_list)
+
+        if id in ids:
+            self.vp("\t...updating")
+            sql_query, params = self.sql_update_str(type_list, id)
+
+        ids.add(id)
+
+        self._execute(sql_query=sql_query, params=params)
+        self.commit()
+        return True
+
+    def _insertion_params(
+        self, typed_columns_list: list[ColumnTypeList], do_create_columns=True
+    ) -> tuple[list[str], list[tuple]]:
+        """Prepares the working table for the given rows and converts them into query parameters.
+
+        :param list[ColumnTypeList] typed_columns_list: rows to be inserted
+        :param bool do_create_columns: if columns don't exist in the table, they will be added to the table, defaults to True
+        :return tuple[list[str], list[tuple]]: union of the rows' columns and one parameter tuple per row
+        """
+        # union of columns across rows, first occurrence sets the column type
+        type_dict: dict[str, TypedColumn] = {}
+        for type_list in typed_columns_list:
+            for t in type_list:
+                type_dict.setdefault(t.column, t)
+        type_list = list(type_dict.values())
+
+        if len(type_list) == 0:
+            return [], []
+
+        if not self.has_table():
+            self.create_table(type_list)
+
+        if do_create_columns:
+            self.add_columns(type_list)
+
+        codec = _compile_row_codec(
+            tuple((c, _value_kind(t.type)) for c, t in type_dict.items())
+        )
+        return list(type_dict), [
+            codec({t.column: t.value for t in type_list})
+            for type_list in typed_columns_list
+        ]
+
+    def _cache_inserted_ids(self, columns: list[str], params: list[tuple]):
+        if self.id_cache is None or self.id_column not in columns:
+            return
+        i = columns.index(self.id_column)
+        self.id_cache |= {p[i] for p in params if p[i] is not None}
+
+    def insert_many(
+        self,
+        typed_columns_list: list[ColumnTypeList],
+        batch_size=1000,
+        do_create_columns=True,
+    ) -> bool:
+        """Inserts rows to table with a single parameterized query.
+
+        Rows are sent in batches of `batch_size` through `executemany` (with `fast_executemany` set, unless `do_fast_executemany` is off), and committed once at the end.
+        Does not check for IDs that are already present in the table.
+
+        :param list[ColumnTypeList] typed_columns_list: rows to be inserted, e.g. from `DBConnector.typed_columns`
+        :param int batch_size: number of rows sent per `executemany` call, defaults to 1000
+        :param bool do_create_columns: if columns don't exist in the table, they will be added to the table, defaults to True
+        :return bool: if insertion was successful
+        """
+        columns, params = self._insertion_params(typed_columns_list, do_create_columns)
+        if len(columns) == 0:
+            return False
+
+        sql_query = self._insert_template(tuple(columns))
 
-        if id in self.get_table_ids(recache):
-            self.vp(f"\t...updating")
-            sql_query = self.sql_update_str(type_list, id)
+        try:
+            for i in range(0, len(params), batch_size):
+                self._crsr.executemany(sql_query, params[i : i + batch_size])
+        except db.Error as pe:
+            self.logger(f"---failed to insert rows: {pe}")
+            self._con.rollback()
+            return False
+        self.commit()
+
+        self._cache_inserted_ids(columns, params)
+        return True
+
+    def insert_dicts(self, obj_dicts: list[dict], do_create_columns=True) -> bool:
+        """Inserts dictionaries to table, sending many rows in each `insert` statement.
+
+        Each statement holds up to 1000 rows (the limit of a SQL Server `values` list), and fewer for wide rows,
+        so that it binds at most 2000 parameters (SQL Server accepts up to 2100). Everything is committed once at the end.
+        Does not check for IDs that are already present in the table.
+
+        :param list[dict] obj_dicts: dictionaries to be inserted
+        :param bool do_create_columns: if columns don't exist in the table, they will be added to the table, defaults to True
+        :return bool: if insertion was successful
+        """
+        columns, params = self._insertion_params(
+            self.typed_columns_batch(obj_dicts), do_create_columns
+        )
+        if len(columns) == 0:
+            return False
 
-        self.id_cache.add(id)
+        rows_per_query = max(1, min(1000, 2000 // len(columns)))
+        row_marks = f"({('?,' * len(columns))[:-1]})"
+        insertion_query = f"insert into {_quote_identifier(self.table)} ({', '.join(map(_quote_identifier, columns))}) values "
 
-        self.execute(sql_query=sql_query)
+        try:
+            for i in range(0, len(params), rows_per_query):
+                rows = params[i : i + rows_per_query]
+                self._crsr.execute(
+                    insertion_query + ", ".join([row_marks] * len(rows)),
+                    tuple(chain.from_iterable(rows)),
+                )
+        except db.Error as pe:
+            self.logger(f"---failed to insert rows: {pe}")
+            self._con.rollback()
+            return False
         self.commit()
+
+        self._cache_inserted_ids(columns, params)
         return True
 
     @staticmethod
@@ -518,87 +1124,132 @@ class DBConnector:
 
     @staticmethod
     def composite_id_type_column(
-        type_list: ColumnTypeList, id_name: str, id_keys: set, separator="+"
+        type_list: ColumnTypeList, id_name: str, id_keys: list, separator="+"
     ) -> TypedColumn:
+        """Composite ID column built from the values of the `id_keys` columns in `type_list`.
+
+        Values are concatenated in `id_keys` order; keys missing from `type_list` are skipped.
+
+        :param ColumnTypeList type_list: typed columns of a record
+        :param str id_name: name of the new ID column
+        :param list id_keys: columns whose values are concatenated into `id_name`
+        :param str separator: separator used in concatenation of values, defaults to '+'
+        :return TypedColumn: the composite ID column
+
+        >>> cols = [TypedColumn('b', 'int', 2), TypedColumn('a', 'int', 1)]
+        >>> DBConnector.composite_id_type_column(cols, 'id', ['a', 'b']).value
+        '1+2'
+        """
+        values = {x.column: x.value for x in type_list}
         return TypedColumn(
             column=id_name,
-            value=separator.join(
-                str(x.value) for x in type_list if x.column in id_keys
-            ),
+            value=separator.join(str(values[k]) for k in id_keys if k in values),
             type="varchar(max)",
         )
 
     def append_to_batch(self, dictionary: dict):
-        """Appends given dictionary to batch dataframe in cache
+        """Appends given dictionary to batch in cache
 
-        Does not execute to SQL databse.
+        Does not execute to SQL databse. The batch dataframe is only built once, by `DBConnector.execute_batch`.
 
         :param dict dictionary: dictionary of values
         """
-        if self.df is None:
-            self.df = pd.json_normalize(dictionary)
-            # create table if it doesn't exist
-            if not self.has_table():
-                # convert first row into type_list
-                pd_types = self.df.dtypes.to_dict()
-                type_list = [
-                    TypedColumn(
-                        column=key, type=self.type_mapper.map(key, str(pd_types[key]))
-                    )
-                    for key, _ in self.df.iloc[0].to_dict().items()
-                ]
-                self.create_table(type_list)
-            return
-        self.df = pd.concat([self.df, pd.json_normalize(dictionary)], ignore_index=True)
+        row = _normalize_record(dictionary)
+        # create table if it doesn't exist, typed the same way `execute_batch` types the columns it adds
+        if len(self._rows) == 0 and not self.has_table():
+            self.create_table(self.frame_type_list(pd.DataFrame.from_records([row])))
+        self._rows.append(row)
 
     @staticmethod
     def concatenated_id_column(
         df: pd.DataFrame, id_keys: list[str], separator="+"
     ) -> pd.Series:
+        """Composite ID column: the `id_keys` columns of `df` as strings, concatenated row-wise with `separator`.
+
+        >>> df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+        >>> DBConnector.concatenated_id_column(df, ['a', 'b']).tolist()
+        ['1+x', '2+y']
+        """
         return (
             df[id_keys[0]]
             .astype(str)
             .str.cat(df[id_keys[1:]].astype(str), sep=separator)
         )
 
-    def executemany(
-        self, iterable_values, query_string: str, tries=10, current=0, is_first=True
-    ):
-        _tabs = " " * current
+    def executemany(self, iterable_values, query_string: str, tries=10, do_commit=True):
+        """Executes the given SQL query once for each set of values.
 
-        if tries == 0:
-            self.logger(
-                f"{_tabs}---failed to execute {query_string} with {iterable_values}"
-            )
-            return
+        :param iterable_values: sequence of value tuples, each bound to the `?` placeholders in `query_string`
+        :param str query_string: SQL query string
+        :param int tries: number of times to try executing the query before giving up, defaults to 10
+        :param bool do_commit: whether to commit after executing, defaults to True
+        """
+        for attempt in range(1, tries + 1):
+            _tabs = " " * attempt
+            try:
+                r = self._crsr.executemany(query_string, iterable_values)
 
-        try:
-            cursor = self._con.cursor()
-            cursor.fast_executemany = self.do_fast_executemany
-            r = cursor.executemany(query_string, iterable_values)
+                if do_commit:
+                    self.commit()
 
-            cursor.commit()
+                if attempt > 1:
+                    self.vp(lambda: f"{_tabs}---execute successful")
+                return r
+            except db.Error as pe:
+                self.vp(lambda: f"{_tabs}---could not execute: {pe}")
+                self.vp(lambda: f"{_tabs}---attempt {attempt} ({tries - attempt} left)")
 
-            if not is_first:
-                self.vp(f"{_tabs}---execute successful")
-            return r
-        except db.Error as pe:
-            self.vp(f"{_tabs}---could not execute: {pe}")
-            try:
-                self.vp(f"{_tabs}---attempt {current} ({tries} left)")
-                return self.executemany(
-                    iterable_values,
-                    query_string=query_string,
-                    tries=tries - 1,
-                    is_first=False,
-                    current=current + 1,
-                )
-            except:
-                return
+        self.logger(f"---failed to execute {query_string} with {iterable_values}")
+
+    def bulk_insert(self, df: pd.DataFrame, do_commit=True) -> bool:
+        """Inserts dataframe rows with a single `bulk insert`, staging them as a CSV file in `bulk_path`.
+
+        The SQL Server reads the file itself, so `bulk_path` must be reachable from the server under the same path.
+        Requires SQL Server 2017 or later (for `format='CSV'`). The staged file is removed afterwards.
+
+        :param pd.DataFrame df: rows to be inserted, with columns that already exist in the table
+        :param bool do_commit: whether to commit after inserting, defaults to True
+        :return bool: if insertion was successful
+        """
+        table_columns = self.get_ordered_table_columns()
+        if not set(df.columns) <= set(table_columns):
+            self.vp(
+                "\t---bulk insert skipped, batch has columns missing from the table"
+            )
+            return False
+
+        # bulk insert maps fields by position, so every table column is written in table order
+        csv_df = df.reindex(columns=table_columns)
+        for column in csv_df.columns:
+            csv_df[column] = _bulk_csv_column(csv_df[column])
+        fname = os.path.abspath(
+            os.path.join(self.bulk_path, f"pydbcon_{uuid4().hex}.csv")
+        )
+
+        try:
+            csv_df.to_csv(fname, header=False, index=False, lineterminator="\n")
+            r = self._execute(
+                f"bulk insert {_quote_identifier(self.table)} from {_quote(fname)} "
+                "with (format='CSV', codepage='65001', rowterminator='0x0a', keepnulls, tablock)",
+                tries=1,
+            )
+        finally:
+            if os.path.exists(fname):
+                os.remove(fname)
+
+        if r is None:
+            self.vp("\t---bulk insert failed, falling back to executemany")
+            return False
+        if do_commit:
+            self.commit()
+        return True
 
+    @staticmethod
     def filter_modified_lines(df: pd.DataFrame) -> pd.DataFrame:
         """Returns only the rows that presented no change
 
+        Not implemented yet: currently returns `df` as is, so every row already in the table gets updated.
+
         :param pd.DataFrame df: dataframe
         :return pd.DataFrame: dataframe containing only the rows that changed
         """
@@ -607,84 +1258,83 @@ class DBConnector:
         # check which rows have changed
 
         # return df with mask for modified rows
-        pass
+        return df
 
     def execute_batch(self, do_create_table=False):
         """Executes batch cached in dataframe, then clears cache"""
+        if len(self._rows) == 0:
+            return
+
+        df = pd.DataFrame.from_records(self._rows)
 
         if self.do_composite_id:
-            self.df[self.composite_kwargs["id_name"]] = (
-                DBConnector.concatenated_id_column(
-                    self.df, id_keys=self.composite_kwargs["id_keys"]
-                )
+            df[self.composite_kwargs["id_name"]] = DBConnector.concatenated_id_column(
+                df, id_keys=self.composite_kwargs["id_keys"]
             )
 
-        # convert first row into type_list
-        pd_types = self.df.dtypes.to_dict()
-        type_list = [
-            TypedColumn(column=key, type=self.type_mapper.map(key, str(pd_types[key])))
-            for key, _ in self.df.iloc[0].to_dict().items()
-        ]
+        type_list = self.frame_type_list(df)
 
         for typed_col in type_list:
-            if typed_col.type == "datetime":
-                self.df[typed_col.column] = pd.to_datetime(
-                    self.df[typed_col.column]
-                ).dt.strftime("%Y-%m-%d %H:%M:%S")
+            if _value_kind(typed_col.type) == "datetime":
+                # native datetimes are bound by the driver without a round-trip through strings
+                dt = pd.to_datetime(df[typed_col.column])
+                df[typed_col.column] = pd.Series(
+                    dt.dt.to_pydatetime(), index=dt.index, dtype=object
+                ).where(dt.notna(), None)
 
         if do_create_table and not self.has_table():
             self.create_table(type_list)
 
-        self.df.replace({nan: None}, inplace=True)
+        df.replace({nan: None}, inplace=True)
 
-        # update dicts that are already in cache
-        update_df = self.filter_modified_lines(
-            self.df[self.df[self.id_column].isin(self.get_table_ids(recache=False))]
+        is_cached = (
+            df[self.id_column].isin(self.get_table_ids(recache=False)).to_numpy()
         )
+        # update dicts that are already in cache
+        update_df = self.filter_modified_lines(df.iloc[is_cached])
         # append dicts that aren't
-        insert_df = self.df[
-            ~self.df[self.id_column].isin(self.get_table_ids(recache=False))
-        ]
+        insert_df = df.iloc[~is_cached]
 
         # create columns that don't exist
         self.add_columns(type_list)
 
-        number_of_columns = len(self.df.columns)
+        columns = tuple(df.columns)
 
-        columns = f"[{'],['.join(self.df.columns)}]"
-        question_marks = ("?," * number_of_columns)[:-1]
+        do_bulk_insert = (
+            self.bulk_path is not None and len(insert_df) > self.bulk_threshold
+        )
+        if do_bulk_insert and self.bulk_insert(insert_df, do_commit=False):
+            insert_df = insert_df.iloc[:0]
 
         if len(insert_df) > 0:
-            insertion_query = (
-                f"insert into {self.table} ({columns}) values ({question_marks})"
-            )
-            insertion_tuple = tuple(
-                tuple(
-                    (value if type(value) != list else str(value))
-                    for value in row.values
-                )
-                for _, row in insert_df.iterrows()
-            )
+            insertion_query = self._insert_template(columns)
+            insertion_tuple = [
+                tuple((value if type(value) != list else str(value)) for value in row)
+                for row in insert_df.itertuples(index=False, name=None)
+            ]
 
-            self.executemany(insertion_tuple, query_string=insertion_query)
+            self.executemany(
+                insertion_tuple, query_string=insertion_query, do_commit=False
+            )
 
         if len(update_df) > 0:
-            update_query = f"update {self.table} set {', '.join([f'[{c}]=?' for c in self.df.columns])} where [{self.id_column}]=?"
-            update_tuple = tuple(
-                tuple(
-                    (value if type(value) != list else str(value))
-                    for value in row.values
-                )
-                + (row[self.id_column],)
-                for _, row in update_df.iterrows()
-            )
+            update_query = self._update_template(columns)
+            ids = update_df[self.id_column].to_numpy(dtype=object)
+            update_tuple = [
+                tuple((value if type(value) != list else str(value)) for value in row)
+                + (row_id,)
+                for row, row_id in zip(update_df.to_numpy(dtype=object), ids)
+            ]
+
+            self.executemany(update_tuple, query_string=update_query, do_commit=False)
 
-            self.executemany(update_tuple, query_string=update_query)
+        self.commit()
 
-        # add newly appended dicts to cache
-        self.id_cache |= set(self.df[self.id_column])
+        # add newly appended dicts to cache, unless a reconnect invalidated it
+        if self.id_cache is not None:
+            self.id_cache |= set(df[self.id_column])
 
-        self.df = None
+        self._rows = []
 
 
 if __name__ == "__main__":